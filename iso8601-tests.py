@@ -4,7 +4,12 @@
 
 import iso8601
 from iso8601 import (parse_ISO8601_date,
-                     parse_ISO8601_time, parse_ISO8601_datetime)
+                     parse_ISO8601_time, parse_ISO8601_datetime,
+                     parse_any, parse_any_stats, reset_parse_any_stats,
+                     parse_ISO8601_duration, parse_ISO8601_interval,
+                     parse_ISO8601_recurrence)
+from datetime import date, datetime, timedelta
+import itertools
 
 import unittest
 
@@ -124,4 +129,156 @@ class Test_ISO8601(unittest.TestCase):
     def test_dt16(s): s.t_dt('2019-12-12T23:59:60-00:00',        ('2019-12-13 00:00:00+00:00', 0, 1000000))
     def test_dt17(s): s.t_dt('2019-12-12T23:59:60Z',             ('2019-12-13 00:00:00+00:00', 0, 1000000))
 
+    def test_arith(s):
+        # results of arithmetic keep the class and the properties
+        p = parse_ISO8601_datetime('2019-12-12T23:59:60.5+09:00')
+        for r in (p + timedelta(days=1), timedelta(days=1) + p, p - timedelta(days=1),
+                  p.replace(year=2020), p.astimezone(iso8601._timezone_utc)):
+            s.assertEqual((type(r), td_us(r.leap), td_us(r.precision)),
+                          (type(p), 500000, 100000))
+        s.assertEqual(str(p.astimezone(iso8601._timezone_utc)), '2019-12-12 15:00:00+00:00')
+        d = parse_ISO8601_date('2019-12') + timedelta(days=3)
+        s.assertEqual((str(d), td_d(d.precision)), ('2019-12-04', 31))
+
+    def t_any(self, s, tier, lp=0):
+        reset_parse_any_stats()
+        p = parse_any(s, leapsecond=lp)
+        q = parse_ISO8601_datetime(s, leapsecond=lp)
+        self.assertEqual(type(p), type(q))
+        self.assertEqual((str(p), td_us(getattr(p, 'leap', None)), td_us(p.precision)),
+                         (str(q), td_us(getattr(q, 'leap', None)), td_us(q.precision)))
+        self.assertEqual(parse_any_stats()[tier], 1)
+
+    def test_any01(s): s.t_any('2019-12-12T20:50:53Z',             'rfc3339')
+    def test_any02(s): s.t_any('2019-12-12T20:50:53.1234567890Z',  'rfc3339')
+    def test_any03(s): s.t_any('2019-12-11t14:30:00-09:30',        'rfc3339')
+    def test_any04(s): s.t_any('2019-12-12T23:59:60.5Z',           'rfc3339')
+    def test_any05(s): s.t_any('2019-12-12T23:59:60+09:00', lp=-1, tier='rfc3339')
+    def test_any06(s): s.t_any('2019-12-12T20:50:53',              'rfc3339')
+    def test_any07(s): s.t_any('2019-12-12',                       'rfc3339')
+    def test_any08(s): s.t_any('20191212T123430+0900',             'iso8601')
+    def test_any09(s): s.t_any('2019-W50-4T12:34.5',               'iso8601')
+    def test_any10(s): s.t_any('2019-12',                          'iso8601')
+
+    def test_any_error(s):
+        reset_parse_any_stats()
+        for v in ('2019-13-12T00:00:00Z', '2019-12-12T', 'x'):
+            with s.assertRaises(ValueError):
+                parse_any(v)
+        s.assertEqual(parse_any_stats(), {"rfc3339": 0, "iso8601": 0, "error": 3})
+
+    def t_du(self, s, ex):
+        p = parse_ISO8601_duration(s)
+        self.assertEqual((p.years, p.months, td_s(p.delta), td_s(p.precision)), ex)
+
+    def test_du01(s): s.t_du('P1Y2M10DT2H30M', (1, 2, 10 * 86400 + 9000, 60))
+    def test_du02(s): s.t_du('P2W',            (0, 0, 14 * 86400, 7 * 86400))
+    def test_du03(s): s.t_du('PT1.5H',         (0, 0, 5400, 360))
+    def test_du04(s): s.t_du('P0,5D',          (0, 0, 43200, 8640))
+    def test_du05(s): s.t_du('PT0.000001S',    (0, 0, (0, 1), (0, 1)))
+    def test_du06(s): s.t_du('P1M',            (0, 1, 0, None))
+
+    def test_du_error(s):
+        for v in ('P', 'PT', 'P1DT', 'P1W2D', 'P1.5Y', 'P1.5DT1H', '1D'):
+            with s.subTest(v=v), s.assertRaises(ValueError):
+                parse_ISO8601_duration(v)
+
+    def t_i(self, s, ex):
+        p = parse_ISO8601_interval(s)
+        self.assertEqual((str(p.start_time), str(p.end_time)), ex)
+
+    def test_i01(s): s.t_i('2019-12-12/2019-12-15',        ('2019-12-12', '2019-12-15'))
+    def test_i02(s): s.t_i('2019-12-12/15',                ('2019-12-12', '2019-12-15'))
+    def test_i03(s): s.t_i('20191212/15',                  ('2019-12-12', '2019-12-15'))
+    def test_i04(s): s.t_i('2008-02-15/03-14',             ('2008-02-15', '2008-03-14'))
+    def test_i05(s): s.t_i('2007-12-14T13:30Z/15:30',      ('2007-12-14 13:30:00+00:00', '2007-12-14 15:30:00+00:00'))
+    def test_i06(s): s.t_i('2019-12-12T10:00Z/2019-12-13', ('2019-12-12 10:00:00+00:00', '2019-12-13 00:00:00+00:00'))
+    def test_i07(s): s.t_i('2019-12-12T10:00+09:00/PT2H',  ('2019-12-12 10:00:00+09:00', '2019-12-12 12:00:00+09:00'))
+    def test_i08(s): s.t_i('2019-12-12/P1DT12H',           ('2019-12-12 00:00:00', '2019-12-13 12:00:00'))
+    def test_i09(s): s.t_i('P1W/2019-12-15',               ('2019-12-08', '2019-12-15'))
+    def test_i10(s): s.t_i('2019-01-31/P1M',               ('2019-01-31', '2019-02-28'))
+    def test_i11(s): s.t_i('2019-12-12/2019-12-13T12:00',  ('2019-12-12 00:00:00', '2019-12-13 12:00:00'))
+    def test_i12(s): s.t_i('2019-12-12T13:30:00.5/14:00:00', ('2019-12-12 13:30:00.500000', '2019-12-12 14:00:00'))
+    def test_i13(s): s.t_i('2019-12-12T13:30+09:00/15:30Z', ('2019-12-12 13:30:00+09:00', '2019-12-12 15:30:00+00:00'))
+    def test_i14(s): s.t_i('2019-W50/W52',                 ('2019-12-09', '2019-12-23'))
+    def test_i15(s): s.t_i('2019-11/2019-12',              ('2019-11-01', '2019-12-01'))
+
+    def test_i_error(s):
+        for v in ('2019-12-12/2019-12-10', '2019-12-12/2019-12-12', '2019-12-12/P0D',
+                  '2019-12-12T13:30/2019-12-12T15:30Z', '9999-12-31/P1D'):
+            with s.subTest(v=v), s.assertRaises(ValueError):
+                parse_ISO8601_interval(v)
+
+    def test_r01(s):
+        r = parse_ISO8601_recurrence('R52/2019-W01/P1W')
+        l = list(r)
+        s.assertEqual((len(r), len(l), str(l[0]), str(l[-1]), td_d(l[0].precision)),
+                      (52, 52, '2018-12-31', '2019-12-23', 7))
+        s.assertEqual(r.index(date(2019, 12, 23)), 51)
+        s.assertNotIn(date(2019, 12, 24), r)
+        s.assertNotIn(date(2019, 12, 30), r)
+        s.assertEqual(str(r[-1]), '2019-12-23')
+
+    def test_r02(s):
+        # unbounded, without drift after short months
+        r = parse_ISO8601_recurrence('R/2019-01-31/P1M')
+        s.assertEqual([str(d) for d in itertools.islice(r, 4)],
+                      ['2019-01-31', '2019-02-28', '2019-03-31', '2019-04-30'])
+        s.assertEqual(r.index(date(2119, 2, 28)), 1201)
+        s.assertIn(date(2119, 1, 31), r)
+        s.assertNotIn(date(2119, 1, 30), r)
+        with s.assertRaises(TypeError):
+            len(r)
+
+    def test_r03(s):
+        r = parse_ISO8601_recurrence('R3/P1D/2019-12-15')
+        s.assertEqual([str(d) for d in r], ['2019-12-14', '2019-12-13', '2019-12-12'])
+        s.assertEqual(r.index(date(2019, 12, 12)), 2)
+
+    def test_r04(s):
+        r = parse_ISO8601_recurrence('R3/2019-12-12T09:00+09:00/PT12H')
+        s.assertEqual([(str(a), str(b)) for a, b in r.intervals()][-1],
+                      ('2019-12-13 09:00:00+09:00', '2019-12-13 21:00:00+09:00'))
+        s.assertEqual(r.as_range(timedelta(hours=1)), range(437808, 437844, 12))
+        s.assertIn(parse_ISO8601_datetime('2019-12-12T12:00Z'), r)
+        s.assertNotIn(datetime(2019, 12, 12, 12, 0), r)
+        with s.assertRaises(ValueError):
+            r.index(datetime(2019, 12, 12, 12, 0))
+
+    def test_r05(s):
+        r = parse_ISO8601_recurrence('R5000000/2019-12-12/PT1H')
+        s.assertEqual(len(r.as_range()), 5000000)
+        s.assertEqual(str(r[4999999]), '2590-05-05 07:00:00')
+        s.assertEqual(r[3].precision, timedelta(hours=1))
+        s.assertIn(datetime(2590, 5, 5, 7), r)
+        s.assertNotIn(datetime(2590, 5, 5, 8), r)
+        with s.assertRaises(ValueError):
+            parse_ISO8601_recurrence('R/2019-12-12/P1M').as_range()
+
+    def test_r06(s):
+        r = parse_ISO8601_recurrence('R/2019-12-12/2019-12-14')
+        s.assertEqual([str(d) for d in itertools.islice(r, 3)],
+                      ['2019-12-12', '2019-12-14', '2019-12-16'])
+        r = parse_ISO8601_recurrence('R3/2019-12-12/2019-12-13T12:00')
+        s.assertEqual([str(d) for d in r],
+                      ['2019-12-12 00:00:00', '2019-12-13 12:00:00', '2019-12-15 00:00:00'])
+        s.assertEqual(r[1].precision, timedelta(minutes=1))
+
+    def test_r07(s):
+        # unbounded recurrences stop at the end of the datetime range
+        l = list(parse_ISO8601_recurrence('R/9999-12-01/P1D'))
+        s.assertEqual((len(l), str(l[-1])), (31, '9999-12-31'))
+        r = parse_ISO8601_recurrence('R/9999-10-01/P1M')
+        s.assertEqual([str(d) for d in r], ['9999-10-01', '9999-11-01', '9999-12-01'])
+        s.assertEqual([str(b) for a, b in r.intervals()], ['9999-11-01', '9999-12-01'])
+        s.assertEqual(len(list(parse_ISO8601_recurrence('R/P1D/0001-01-05'))), 4)
+
+    def test_r_error(s):
+        for v in ('R3/P1D', 'R/P1D/P1D', 'R-1/2019/P1Y', '2019/P1Y',
+                  'R/2019-12-12/2019-12-12', 'R/2019-12-12/PT0S',
+                  'R3/2019-12-12T13:30/2019-12-12T15:30Z',
+                  'R5/9999-12-30/P1D', 'R3/P1D/0001-01-03'):
+            with s.subTest(v=v), s.assertRaises(ValueError):
+                parse_ISO8601_recurrence(v)
+
 unittest.main()
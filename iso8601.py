@@ -47,7 +47,14 @@ standard, for example:
    * Timezone offsets: 2019-12-12T12:34.5+09, 20191212T123430+0900
 
 Provided functions are 'parse_ISO8601_date', 'parse_ISO8601_time',
-'parse_ISO8601_datetime'.
+'parse_ISO8601_datetime'.  The function 'parse_any' accepts the same
+inputs as 'parse_ISO8601_datetime', taking a faster path for strings
+in the RFC 3339 subset.
+
+Durations (P1Y2M10DT2H30M, P2W), time intervals (2019-12-12/P1W,
+2019-12-12T13:30/15:30) and recurring time intervals (R52/2019-W01/P1W)
+are parsed by 'parse_ISO8601_duration', 'parse_ISO8601_interval' and
+'parse_ISO8601_recurrence'.  Recurrences are expanded lazily.
 
 Note: It does not accept obsolete formats (e.g. 2-digit year like
 19-12-12 or 191212) defined in ISO 8601:1999.
@@ -55,7 +62,10 @@ Note: It does not accept obsolete formats (e.g. 2-digit year like
 """
 
 __author__ = 'Yutaka OIWA <yutaka@oiwa.jp>'
-__all__ = ['parse_ISO8601_date', 'parse_ISO8601_time', 'parse_ISO8601_datetime']
+__all__ = ['parse_ISO8601_date', 'parse_ISO8601_time', 'parse_ISO8601_datetime',
+           'parse_any', 'parse_any_stats', 'reset_parse_any_stats',
+           'parse_ISO8601_duration', 'parse_ISO8601_interval',
+           'parse_ISO8601_recurrence']
 
 import re
 
@@ -88,6 +98,14 @@ except ImportError:
 
 from datetime import datetime, date, time
 
+_epoch = datetime(1970, 1, 1)
+_epoch_utc = datetime(1970, 1, 1, tzinfo=_timezone_utc)
+_epoch_date = date(1970, 1, 1)
+
+def _td_us(td):
+    # a timedelta in integer microseconds
+    return (td.days * 86400 + td.seconds) * 1000000 + td.microseconds
+
 datepart = (r"""(?x:(?P<EXT>-?)
                    (?:(?P<M>[01]\d)(?P=EXT)(?P<D>[0-3]\d)
                       |(?P<YD>[0-3]\d\d)
@@ -162,6 +180,9 @@ def parse_date_to_start(s, digits_year_ext=4):
 
 def parse_date_to_start_duration(s, digits_year_ext=4):
     m = parse_date_to_tuple(s, digits_year_ext);
+    return date_tuple_to_start_duration(m, digits_year_ext=digits_year_ext)
+
+def date_tuple_to_start_duration(m, digits_year_ext=4):
     day = date_tuple_to_start(m, digits_year_ext=digits_year_ext)
     if m[0] in ("day", "day-year", "day-week"):
         return day, _single_day
@@ -181,15 +202,42 @@ def parse_date_to_start_duration(s, digits_year_ext=4):
     else:
         raise AssertionError("should not happen: unknown type")
 
+# The *WithPrecision classes below are constructed either from a
+# base object and the extra properties, or with the arguments of the
+# base class.  The latter is used by the standard library to create
+# results of arithmetic (e.g. d + timedelta(1), dt.astimezone(tz)),
+# which inherit the properties of the operand.
+
+def _inherit_properties(cls, *names):
+    def inherit(self, o):
+        if isinstance(o, cls):
+            for n in names:
+                setattr(o, n, getattr(self, n))
+        return o
+    cls._inherit = inherit
+    base = cls.__bases__[0]
+    for m in ('__add__', '__radd__', '__sub__', 'replace', 'astimezone'):
+        f = getattr(base, m, None)
+        if f is not None:
+            setattr(cls, m, (lambda f: lambda self, *a, **k: self._inherit(f(self, *a, **k)))(f))
+    return cls
+
 class dateWithPrecision(date):
     __slots__ = ("precision",)
-    def __new__(self, d, p):
-        o = super(dateWithPrecision, self).__new__(self, d.year, d.month, d.day)
+    def __new__(self, *args, **kwargs):
+        if len(args) == 2 and isinstance(args[0], date):
+            d, p = args
+            o = super(dateWithPrecision, self).__new__(self, d.year, d.month, d.day)
+        else:
+            o = super(dateWithPrecision, self).__new__(self, *args, **kwargs)
+            p = None
         o.precision = p
         return o
-    def __init__(self, d, p):
+    def __init__(self, *args, **kwargs):
         pass
 
+_inherit_properties(dateWithPrecision, "precision")
+
 def parse_ISO8601_date(s, digits_year_ext=4):
     """Parse a date string formatted in ISO 8601 syntax.
 
@@ -223,23 +271,25 @@ def _frac_to_spec(s):
     expo = len(s or "")
     return (int(s or "0"), 10 ** expo)
 
-def parse_time_to_tuple(s):
-    m = time_regexp.match(s)
-    if not m:
-        raise ValueError("invalid time spec")
-    m = m.groupdict()
-
-    # timezone
-    if m['TZ'] == '':
-        tz = None
+def _tz_of_match(m):
+    if m['TZ'] in ('', None):
+        return None
     elif m['TZ'] in ('Z', 'z'):
-        tz = _timezone_utc
+        return _timezone_utc
     else:
         tzhour = m['TZH']
         tzminute = (m['TZM'] or "00")
         tzofs = timedelta(hours=int(tzhour), minutes=int(tzminute))
         if m['TZSIGN'] == '-': tzofs = -tzofs
-        tz = timezone(tzofs)
+        return timezone(tzofs)
+
+def parse_time_to_tuple(s):
+    m = time_regexp.match(s)
+    if not m:
+        raise ValueError("invalid time spec")
+    m = m.groupdict()
+
+    tz = _tz_of_match(m)
 
     if m['S'] is not None:
         numer, denom = _frac_to_spec(m['SF'])
@@ -309,15 +359,22 @@ def parse_time_to_start_prec(s, leapsecond=0):
 
 class timeWithPrecision(time):
     __slots__ = ("precision", "leap", "delta")
-    def __new__(self, t, delta, leap, precision):
-        o = super(timeWithPrecision, self).__new__(self, t.hour, t.minute, t.second, t.microsecond, tzinfo=t.tzinfo)
+    def __new__(self, *args, **kwargs):
+        if len(args) == 4 and isinstance(args[0], time):
+            t, delta, leap, precision = args
+            o = super(timeWithPrecision, self).__new__(self, t.hour, t.minute, t.second, t.microsecond, tzinfo=t.tzinfo)
+        else:
+            o = super(timeWithPrecision, self).__new__(self, *args, **kwargs)
+            delta, leap, precision = _zerodelta, None, None
         o.delta = delta
         o.leap = leap
         o.precision = precision
         return o
-    def __init__(self, t, delta, leap, precision):
+    def __init__(self, *args, **kwargs):
         pass
 
+_inherit_properties(timeWithPrecision, "precision", "leap", "delta")
+
 def parse_ISO8601_time(s, leapsecond=0, with_delta=False):
     """Parse a time-in-day string formatted in ISO 8601 syntax.
 
@@ -377,21 +434,31 @@ def parse_ISO8601_time(s, leapsecond=0, with_delta=False):
 
 datetime_sep_regexp = re.compile(r'\A(.+?)([Tt](.+))\Z')
 
+# fold (PEP 495) is only available in Python 3.6 or later
+_fold_of = lambda dt: {'fold': 1} if getattr(dt, 'fold', 0) else {}
+
 class datetimeWithPrecision(datetime):
     __slots__ = ("leap", "precision",)
-    def __new__(self, dt, leap, prec):
-        o = super(datetimeWithPrecision, self).__new__(
-                self,
-                dt.year, dt.month, dt.day,
-                dt.hour, dt.minute, dt.second, dt.microsecond,
-                tzinfo=dt.tzinfo)
+    def __new__(self, *args, **kwargs):
+        if len(args) == 3 and isinstance(args[0], datetime):
+            dt, leap, prec = args
+            o = super(datetimeWithPrecision, self).__new__(
+                    self,
+                    dt.year, dt.month, dt.day,
+                    dt.hour, dt.minute, dt.second, dt.microsecond,
+                    tzinfo=dt.tzinfo, **_fold_of(dt))
+        else:
+            o = super(datetimeWithPrecision, self).__new__(self, *args, **kwargs)
+            leap, prec = None, None
         o.leap = leap
         o.precision = prec
         return o
 
-    def __init__(self, dt, leap, prec):
+    def __init__(self, *args, **kwargs):
         pass
 
+_inherit_properties(datetimeWithPrecision, "leap", "precision")
+
 # TODO: consistency of extended/normal notations between components are not checked
 def parse_ISO8601_datetime(s, digits_year_ext=4, leapsecond=0):
     """Parse a date string formatted in ISO 8601 syntax.
@@ -421,14 +488,581 @@ def parse_ISO8601_datetime(s, digits_year_ext=4, leapsecond=0):
     """
     match = datetime_sep_regexp.match(s)
     if match:
-        date, duration = parse_date_to_start_duration(match.group(1), digits_year_ext=digits_year_ext)
-        if duration > _single_day:
-            raise ValueError("not-a-single-day date with a specific time")
-        t = parse_time_to_start_prec(match.group(3), leapsecond=leapsecond)
-        if not t: return t
-        time, delta, leap, duration = t
-        date_time = datetime.combine(date, time)
-        date_time += delta
-        return datetimeWithPrecision(date_time, leap, duration)
+        return datetime_tuples_to_datetime(
+            parse_date_to_tuple(match.group(1), digits_year_ext),
+            parse_time_to_tuple(match.group(3)), leapsecond=leapsecond)
     else:
         return parse_ISO8601_date(s, digits_year_ext=digits_year_ext)
+
+def datetime_tuples_to_datetime(d, t, leapsecond=0):
+    date, duration = date_tuple_to_start_duration(d)
+    if duration > _single_day:
+        raise ValueError("not-a-single-day date with a specific time")
+    t = time_tuple_to_start_prec(t, leapsecond=leapsecond)
+    if not t: return t
+    time, delta, leap, duration = t
+    date_time = datetime.combine(date, time)
+    date_time += delta
+    return datetimeWithPrecision(date_time, leap, duration)
+
+# Tiered parsing: most of real-world inputs are in the RFC 3339
+# subset, which can be handled by a single precompiled regexp.
+# Anything else falls back to the full ISO 8601 grammar above.
+
+rfc3339_regexp = re.compile(
+           r'''(?x)\A(?P<Y>\d\d\d\d)-(?P<MO>\d\d)-(?P<D>\d\d)
+                    (?:[Tt](?P<H>\d\d):(?P<M>\d\d):(?P<S>\d\d)(?P<SF>\.\d+)?
+                       (?P<TZ>|[Zz]|(?P<TZSIGN>[-+])(?P<TZH>\d\d):(?P<TZM>\d\d)))?\Z''')
+
+_parse_any_hits = {"rfc3339": 0, "iso8601": 0, "error": 0}
+
+def _parse_RFC3339_subset(m, leapsecond):
+    d = date(int(m['Y']), int(m['MO']), int(m['D']))
+    if m['H'] is None:
+        return dateWithPrecision(d, _single_day)
+    numer, denom = _frac_to_spec(m['SF'])
+    t = ("s", int(m['H']), int(m['M']), int(m['S']), numer, denom, 1, _tz_of_match(m))
+    time, delta, leap, duration = time_tuple_to_start_prec(t, leapsecond=leapsecond)
+    return datetimeWithPrecision(datetime.combine(d, time) + delta, leap, duration)
+
+def parse_any(s, digits_year_ext=4, leapsecond=0):
+    """Parse a date string formatted in either RFC 3339 or ISO 8601 syntax.
+
+    It accepts the same inputs and arguments, and returns the same
+    values as `parse_ISO8601_datetime`.  Strings in the RFC 3339
+    subset (e.g. "2019-12-12T20:50:53Z") are handled by a dedicated
+    fast path; others are passed to the full ISO 8601 parser.
+
+    The number of inputs handled by each path is counted; see
+    `parse_any_stats`.
+
+    """
+    try:
+        m = rfc3339_regexp.match(s)
+        if m:
+            r = _parse_RFC3339_subset(m.groupdict(), leapsecond)
+            _parse_any_hits["rfc3339"] += 1
+        else:
+            r = parse_ISO8601_datetime(s, digits_year_ext=digits_year_ext,
+                                       leapsecond=leapsecond)
+            _parse_any_hits["iso8601"] += 1
+    except ValueError:
+        _parse_any_hits["error"] += 1
+        raise
+    return r
+
+def parse_any_stats():
+    """Return the hit counters of `parse_any` as a dict.
+
+    Keys are "rfc3339" (handled by the fast path), "iso8601" (handled
+    by the full parser) and "error" (rejected inputs).
+
+    """
+    return dict(_parse_any_hits)
+
+def reset_parse_any_stats():
+    """Reset all hit counters of `parse_any` to zero."""
+    for k in _parse_any_hits:
+        _parse_any_hits[k] = 0
+
+# Durations, time intervals and recurring time intervals
+# (ISO 8601-1:2019 sections 5.5 and 5.6).
+#
+# Durations are accepted in the format with designators
+# (e.g. P1Y2M10DT2H30M or P2W); only the lowest-order component may
+# have a decimal fraction.
+
+duration_regexp = re.compile(
+           r'''(?x)\A[Pp](?=[\dTt])
+                    (?:(?P<W>\d+(?:[,.]\d+)?)[Ww]
+                      |(?:(?P<Y>\d+(?:[,.]\d+)?)[Yy])?
+                       (?:(?P<MO>\d+(?:[,.]\d+)?)[Mm])?
+                       (?:(?P<D>\d+(?:[,.]\d+)?)[Dd])?
+                       (?:[Tt](?=\d)
+                          (?:(?P<H>\d+(?:[,.]\d+)?)[Hh])?
+                          (?:(?P<M>\d+(?:[,.]\d+)?)[Mm])?
+                          (?:(?P<S>\d+(?:[,.]\d+)?)[Ss])?)?)\Z''')
+
+# length of each component in microseconds; None for nominal ones.
+_duration_units = (("Y", None), ("MO", None), ("W", 7 * 86400000000),
+                   ("D", 86400000000), ("H", 3600000000),
+                   ("M", 60000000), ("S", 1000000))
+
+_days_in_month = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+def _plain(d):
+    # occurrences are computed on plain values; the precision of the
+    # anchor is attached again when they are returned.
+    if isinstance(d, datetime):
+        return datetime.combine(d, d.timetz())
+    return date(d.year, d.month, d.day)
+
+def _add_months(d, months):
+    y, m = divmod(d.month - 1 + months, 12)
+    y += d.year
+    last = _days_in_month[m]
+    if m == 1 and (y % 4 == 0 and (y % 100 != 0 or y % 400 == 0)):
+        last = 29
+    return d.replace(year=y, month=m + 1, day=min(d.day, last))
+
+class Duration(object):
+    """A duration, as parsed by `parse_ISO8601_duration`.
+
+    Properties:
+
+      years, months: nominal components, as integers.
+
+      delta: the remaining components (weeks, days, hours, minutes,
+             seconds) as a `timedelta` object.  Days are taken as
+             exactly 24 hours.
+
+      precision: a `timedelta` object representing a width of the
+                 lowest-order component in the input (e.g. 6 minutes
+                 for PT1.5H), or None if it is years or months.
+
+    """
+    __slots__ = ("years", "months", "delta", "precision")
+
+    def __init__(self, years=0, months=0, delta=_zerodelta, precision=None):
+        self.years = years
+        self.months = months
+        self.delta = delta
+        self.precision = precision
+
+    def __repr__(self):
+        return "Duration(%d, %d, %r)" % (self.years, self.months, self.delta)
+
+    def __eq__(self, other):
+        return (isinstance(other, Duration) and
+                (self.years * 12 + self.months, self.delta) ==
+                (other.years * 12 + other.months, other.delta))
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((self.years * 12 + self.months, self.delta))
+
+    @property
+    def nominal(self):
+        """True if the duration has year or month components."""
+        return self.years * 12 + self.months != 0
+
+    def add_to(self, d, n=1):
+        """Return `d` (a `date` or `datetime`) added by `n` times the duration.
+
+        Nominal components are added first; a day of month which does
+        not exist in the resulting month is clamped to its last day.
+        A `date` is promoted to a `datetime` if the duration has a
+        sub-day part.  `n` may be negative.
+
+        """
+        d = _plain(d)
+        if not isinstance(d, datetime) and self.delta % _single_day:
+            d = datetime.combine(d, time())
+        months = (self.years * 12 + self.months) * n
+        if months:
+            d = _add_months(d, months)
+        return d + self.delta * n
+
+def parse_ISO8601_duration(s):
+    """Parse a duration string formatted in ISO 8601 syntax.
+
+    It accepts the format with designators, e.g. "P1Y2M10DT2H30M",
+    "PT0.5S" or "P2W".  Fractions are allowed in the lowest-order
+    component except for years and months.
+
+    Returned value is a `Duration` object.
+
+    """
+    m = duration_regexp.match(s)
+    if not m:
+        raise ValueError("invalid duration string")
+    m = m.groupdict()
+    present = [(k, u) for k, u in _duration_units if m[k] is not None]
+    years = months = us = 0
+    precision = None
+    for k, unit in present:
+        i, _, f = m[k].replace(',', '.').partition('.')
+        if f and k != present[-1][0]:
+            raise ValueError("a fraction is only allowed in the last component")
+        if unit is None:
+            if f:
+                raise ValueError("fractional years or months are not supported")
+            if k == "Y": years = int(i)
+            else: months = int(i)
+            continue
+        numer, denom = _frac_to_spec("." + f if f else None)
+        us += unit * int(i) + unit * numer // denom
+        precision = timedelta(microseconds=unit // denom) or timedelta.resolution
+    return Duration(years, months, timedelta(microseconds=us), precision)
+
+class Interval(object):
+    """A time interval, as parsed by `parse_ISO8601_interval`.
+
+    Properties `start`, `end` and `duration` hold the parsed
+    components given in the input (None if not given).  `start` and
+    `end` are values returned by `parse_ISO8601_datetime`, keeping
+    their `precision`.
+
+    Properties `start_time` and `end_time` give the boundaries as plain
+    `date` or `datetime` objects, computing a missing one from the
+    duration.  The interval covers from `start_time` up to (not
+    including) `end_time`; in particular the end is the start of the
+    period written as the end, e.g. "2019-12-12/2019-12-15" is three
+    days long and "2019-11/2019-12" is November only.  This is a
+    deliberate exception to the precision model of the other parsing
+    functions (where "2019-12" stands for the whole month), so that
+    "13:30/15:30" ends at 15:30 rather than 15:31, and "start/end"
+    agrees with "start/duration".  If one boundary is a `date` and the other a
+    `datetime`, the date is taken as its midnight in the time zone of
+    the other.
+
+    """
+    __slots__ = ("start", "end", "duration")
+
+    def __init__(self, start=None, end=None, duration=None):
+        self.start = start
+        self.end = end
+        self.duration = duration
+
+    def __repr__(self):
+        return "Interval(%r, %r, %r)" % (self.start, self.end, self.duration)
+
+    def _bounds(self):
+        if self.start is None:
+            e = _plain(self.end)
+            s = self.duration.add_to(e, -1)
+        elif self.end is None:
+            s = _plain(self.start)
+            e = self.duration.add_to(s)
+        else:
+            s, e = _plain(self.start), _plain(self.end)
+        # a date is promoted as in Duration.add_to, in the time zone
+        # of the other boundary.
+        if not isinstance(s, datetime) and isinstance(e, datetime):
+            s = datetime.combine(s, time(), e.tzinfo)
+        elif isinstance(s, datetime) and not isinstance(e, datetime):
+            e = datetime.combine(e, time(), s.tzinfo)
+        return s, e
+
+    @property
+    def start_time(self):
+        return self._bounds()[0]
+
+    @property
+    def end_time(self):
+        return self._bounds()[1]
+
+# lower-order components of a date, as they may appear at the end of
+# an interval, for each kind of date tuple of the start.
+_date_tail_regexps = {
+    "day":      re.compile(r'\A(?:(\d\d)-?)?(\d\d)\Z'),
+    "day-year": re.compile(r'\A(\d\d\d)\Z'),
+    "day-week": re.compile(r'\A(?:[Ww](\d\d)-?)?([1-7])\Z'),
+    "week":     re.compile(r'\A[Ww](\d\d)\Z'),
+    "month":    re.compile(r'\A(\d\d)\Z'),
+}
+
+def _complete_date_tuple(start, end, digits_year_ext):
+    r = _date_tail_regexps.get(start[0])
+    m = r.match(end) if r else None
+    if not m:
+        return parse_date_to_tuple(end, digits_year_ext)
+    given = tuple(int(g) for g in m.groups() if g is not None)
+    return start[:len(start) - len(given)] + given
+
+def _parse_interval_end(start, end, digits_year_ext, leapsecond):
+    # The end may omit higher-order components of the start, and
+    # inherits its time zone unless it has its own: e.g.
+    # 2019-12-12T13:30Z/15:30, 2019-12-12/15 or 2008-02-15/03-14.
+    # The end is completed on parsed tuples, component by component.
+    m = datetime_sep_regexp.match(start)
+    sd, st = (m.group(1), m.group(3)) if m else (start, None)
+    m = datetime_sep_regexp.match(end)
+    if m:
+        ed, et = m.group(1), m.group(3)
+    elif end[:1] in ('T', 't') or (st is not None and time_regexp.match(end)):
+        ed, et = '', end.lstrip('Tt')
+    else:
+        ed, et = end, None
+    d = parse_date_to_tuple(sd, digits_year_ext)
+    if ed:
+        d = _complete_date_tuple(d, ed, digits_year_ext)
+    if et is None:
+        return dateWithPrecision(*date_tuple_to_start_duration(d))
+    t = parse_time_to_tuple(et)
+    if t[7] is None and st is not None:
+        t = t[:7] + (parse_time_to_tuple(st)[7],)
+    return datetime_tuples_to_datetime(d, t, leapsecond=leapsecond)
+
+def parse_ISO8601_interval(s, digits_year_ext=4, leapsecond=0):
+    """Parse a time interval string formatted in ISO 8601 syntax.
+
+    Accepted forms are "start/end", "start/duration" and
+    "duration/end", where start and end are accepted by
+    `parse_ISO8601_datetime` (with the optional arguments passed
+    through) and duration by `parse_ISO8601_duration`.  The end of the
+    first form may omit higher-order components which are the same as
+    the start (e.g. "2019-12-12T13:30/15:30").
+
+    ValueError is raised if the end is not after the start, or if
+    only one of them has a time zone.
+
+    Returned value is an `Interval` object.
+
+    """
+    parse = lambda v: parse_ISO8601_datetime(v, digits_year_ext=digits_year_ext,
+                                             leapsecond=leapsecond)
+    parts = s.split('/')
+    if len(parts) != 2:
+        raise ValueError("invalid interval string")
+    a, b = parts
+    if a[:1] in ('P', 'p'):
+        if b[:1] in ('P', 'p'):
+            raise ValueError("an interval with two durations")
+        r = Interval(end=parse(b), duration=parse_ISO8601_duration(a))
+    else:
+        start = parse(a)
+        if b[:1] in ('P', 'p'):
+            r = Interval(start=start, duration=parse_ISO8601_duration(b))
+        else:
+            r = Interval(start=start, end=_parse_interval_end(
+                a, b, digits_year_ext, leapsecond))
+    try:
+        s, e = r._bounds()
+    except (OverflowError, ValueError):
+        raise ValueError("interval out of the supported range")
+    if (getattr(s, 'tzinfo', None) is None) != (getattr(e, 'tzinfo', None) is None):
+        raise ValueError("an interval mixing local time and time with time zone")
+    if not s < e:
+        raise ValueError("an interval not ending after its start")
+    return r
+
+class Recurrence(object):
+    """A recurring time interval, as parsed by `parse_ISO8601_recurrence`.
+
+    Properties:
+
+      count: the number of occurrences, or None if unbounded.
+
+      interval: the first (or, for the "duration/end" form, the last)
+                occurrence as an `Interval` object.
+
+    Occurrences are never materialised.  Iterating over the object
+    yields the start of each occurrence lazily; `intervals()` yields
+    (start, end) pairs.  Yielded values are `dateWithPrecision` or
+    `datetimeWithPrecision` objects having the precision of the
+    parsed start (or end).  For the "duration/end" form, occurrences
+    are yielded backwards in time, ending at the given end.
+    A bounded recurrence must lie within the range of `datetime`
+    (years 1 to 9999); iteration of an unbounded one stops at its
+    limits.  When a date is promoted to a datetime (e.g. in
+    R/2019-12-12/PT1H), occurrences get the precision of the duration
+    (or of the end) instead of a day.
+
+    The k-th occurrence is the anchor added by k times the duration
+    (not k times repeated additions), so that month-based rules do not
+    drift: R/2019-01-31/P1M occurs on 01-31, 02-28, 03-31, ...  Thus,
+    indexing (`r[k]`), `len(r)` and membership tests (`t in r`, or
+    `r.index(t)`) take constant time without expansion.
+
+    """
+    __slots__ = ("count", "interval", "_anchor", "_step", "_a", "_b", "_precision")
+
+    def __init__(self, count, interval):
+        self.count = count
+        self.interval = interval
+        if interval.start is not None:
+            self._anchor, end = interval._bounds()
+            self._a, self._b = 0, 1
+            step = interval.duration
+            if step is None:
+                step = Duration(delta=end - self._anchor)
+                if step.delta <= _zerodelta:
+                    raise ValueError("an interval ending before its start")
+            self._precision = getattr(interval.start, 'precision', None)
+        else:
+            self._anchor = _plain(interval.end)
+            self._a, self._b = -1, -1
+            step = interval.duration
+            self._precision = getattr(interval.end, 'precision', None)
+        if not step.nominal and step.delta == _zerodelta:
+            raise ValueError("a recurrence with zero-length duration")
+        if not isinstance(self._anchor, datetime) and step.delta % _single_day:
+            self._anchor = datetime.combine(self._anchor, time())
+        if (isinstance(self._anchor, datetime) and
+            not isinstance(interval.start or interval.end, datetime)):
+            # a date promoted to its midnight: occurrences are as
+            # precise as the duration (or the end) instead of a day.
+            if interval.duration is not None:
+                self._precision = interval.duration.precision
+            else:
+                self._precision = getattr(interval.end, 'precision', None)
+        self._step = step
+        if count:
+            j = self._a + self._b * (count - 1)
+            try:
+                step.add_to(self._anchor, j)
+                step.add_to(self._anchor, j + 1)
+            except (OverflowError, ValueError):
+                raise ValueError("a recurrence beyond the supported range")
+
+    def __repr__(self):
+        return "Recurrence(%r, %r)" % (self.count, self.interval)
+
+    def __len__(self):
+        if self.count is None:
+            raise TypeError("unbounded recurrence has no length")
+        return self.count
+
+    def _wrap(self, d):
+        p = self._precision
+        if p is None:
+            return d
+        if isinstance(d, datetime):
+            return datetimeWithPrecision(d, None, p)
+        return dateWithPrecision(d, p)
+
+    def _start(self, k):
+        return self._step.add_to(self._anchor, self._a + self._b * k)
+
+    def __getitem__(self, k):
+        if k < 0:
+            if self.count is None:
+                raise IndexError("negative index to unbounded recurrence")
+            k += self.count
+        if k < 0 or (self.count is not None and k >= self.count):
+            raise IndexError("recurrence index out of range")
+        return self._wrap(self._start(k))
+
+    def __iter__(self):
+        k = 0
+        step = self._step
+        if not step.nominal:
+            # plain arithmetic progression
+            d = self._start(0)
+            delta = step.delta * self._b
+            while self.count is None or k < self.count:
+                yield self._wrap(d)
+                try:
+                    d += delta
+                except OverflowError:
+                    return
+                k += 1
+        else:
+            while self.count is None or k < self.count:
+                try:
+                    d = self._start(k)
+                except (OverflowError, ValueError):
+                    return
+                yield self._wrap(d)
+                k += 1
+
+    def intervals(self):
+        """Yield (start, end) pairs of the occurrences lazily."""
+        k = 0
+        while self.count is None or k < self.count:
+            j = self._a + self._b * k
+            try:
+                start = self._step.add_to(self._anchor, j)
+                end = self._step.add_to(self._anchor, j + 1)
+            except (OverflowError, ValueError):
+                return
+            yield (self._wrap(start), end)
+            k += 1
+
+    def index(self, t):
+        """Return k where the k-th occurrence starts at `t`.
+
+        Raises ValueError if `t` is not a start of an occurrence.
+        Computed in constant time.
+
+        """
+        t = _plain(t)
+        anchor, step = self._anchor, self._step
+        if isinstance(anchor, datetime) and not isinstance(t, datetime):
+            t = datetime.combine(t, time())
+        elif not isinstance(anchor, datetime) and isinstance(t, datetime):
+            if t.time() != time() or t.tzinfo is not None:
+                raise ValueError("not an occurrence")
+            t = t.date()
+        try:
+            diff = t - anchor
+        except TypeError:
+            # local time against time with time zone, or vice versa
+            raise ValueError("not an occurrence")
+        if not step.nominal:
+            j, r = divmod(diff, step.delta)
+            candidates = (j,) if r == _zerodelta else ()
+        else:
+            # months vary in length, but stay within a few days of the
+            # average (146097 days per 4800 months) over any span.
+            length = ((step.years * 12 + step.months) * 146097 / 4800.0
+                      + step.delta / _single_day)
+            j0 = int(round(diff / _single_day / length))
+            candidates = (j0 - 1, j0, j0 + 1)
+        for j in candidates:
+            k = (j - self._a) * self._b
+            if k < 0 or (self.count is not None and k >= self.count):
+                continue
+            try:
+                if step.add_to(anchor, j) == t:
+                    return k
+            except (ValueError, OverflowError):
+                pass
+        raise ValueError("not an occurrence")
+
+    def __contains__(self, t):
+        try:
+            self.index(t)
+        except (ValueError, TypeError):
+            return False
+        return True
+
+    def as_range(self, unit=timedelta(microseconds=1)):
+        """Return the occurrence starts as a `range` of integers.
+
+        Each element counts `unit`s from 1970-01-01T00:00 (in UTC, for
+        times with a time zone).  A `range` represents the arithmetic
+        sequence in constant memory, and can be passed to e.g.
+        `numpy.arange(r.start, r.stop, r.step)` for bulk processing.
+
+        Only bounded recurrences with a fixed-length duration (no
+        years or months) can be represented; otherwise ValueError is
+        raised, as well as if the values are not multiples of `unit`.
+
+        """
+        if self.count is None or self._step.nominal:
+            raise ValueError("not a bounded, fixed-length recurrence")
+        first = self._start(0)
+        if not isinstance(first, datetime):
+            first = datetime.combine(first, time())
+        if first.tzinfo is not None:
+            first = first - first.utcoffset()
+        first, r1 = divmod(first.replace(tzinfo=None) - datetime(1970, 1, 1), unit)
+        step, r2 = divmod(self._step.delta * self._b, unit)
+        if r1 or r2:
+            raise ValueError("occurrences are not multiples of the unit")
+        return range(first, first + step * self.count, step)
+
+recurrence_regexp = re.compile(r'\A[Rr](\d*)/(.+)\Z')
+
+def parse_ISO8601_recurrence(s, digits_year_ext=4, leapsecond=0):
+    """Parse a recurring time interval string formatted in ISO 8601 syntax.
+
+    The input is "Rn/interval", where n is the number of occurrences
+    (omitted for an unbounded recurrence) and interval is accepted by
+    `parse_ISO8601_interval`, e.g. "R52/2019-W01/P1W" or
+    "R/2019-12-12T09:00+09:00/PT12H".
+
+    Returned value is a `Recurrence` object.
+
+    """
+    m = recurrence_regexp.match(s)
+    if not m:
+        raise ValueError("invalid recurrence string")
+    count = int(m.group(1)) if m.group(1) else None
+    interval = parse_ISO8601_interval(m.group(2), digits_year_ext=digits_year_ext,
+                                      leapsecond=leapsecond)
+    return Recurrence(count, interval)
@@ -0,0 +1,172 @@
+# -*- python -*-
+# Binary cache of parsed ISO 8601:2019 datetime columns.
+# TESTS
+
+from iso8601 import parse_ISO8601_datetime, parse_ISO8601_time, parse_any
+from rfc3339 import parse_RFC3339_datetime
+from iso8601_cache import (write_cache, load_cache, ParsedCache,
+                           HEADER_SIZE, RECORD_SIZE)
+import iso8601_cache
+
+import os
+import tempfile
+import unittest
+
+inputs = ['2019-12-12T20:50:53Z',
+          '2019-12-12T20:50:53.1234+09:30',
+          '2019-12-12T23:59:60.5Z',
+          '20191212T123430-0900',
+          '2019-12-12T12:34.5',
+          '2019-W50',
+          '0004-12-25',
+          '2019']
+
+def key(v):
+    return (type(v).__name__, str(v), getattr(v, 'precision', None),
+            getattr(v, 'leap', None), getattr(v, 'delta', None))
+
+class Test_ISO8601_Cache(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'col.cache')
+        self.source = os.path.join(self.dir.name, 'col.txt')
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_roundtrip(self):
+        values = [parse_ISO8601_datetime(s) for s in inputs]
+        self.assertEqual(write_cache(self.path, iter(values)), len(values))
+        self.assertEqual(os.path.getsize(self.path),
+                         HEADER_SIZE + RECORD_SIZE * len(values))
+        with ParsedCache(self.path) as c:
+            self.assertEqual(len(c), len(values))
+            self.assertEqual([key(v) for v in c], [key(v) for v in values])
+            self.assertEqual(key(c[-1]), key(values[-1]))
+            self.assertEqual(len(c.record(1)), RECORD_SIZE)
+            with self.assertRaises(IndexError):
+                c[len(values)]
+
+    def test_plain(self):
+        values = [parse_RFC3339_datetime('2019-12-12T20:50:53Z'),
+                  parse_RFC3339_datetime('2019-12-12'),
+                  parse_any('2019-12-12T20:50:53Z')]
+        write_cache(self.path, values)
+        with ParsedCache(self.path) as c:
+            self.assertEqual([key(v) for v in c], [key(v) for v in values])
+
+    def test_time(self):
+        values = [parse_ISO8601_time('12:34:56.5+09:00'),
+                  parse_ISO8601_time('1230'),
+                  parse_ISO8601_time('24:00', with_delta=True),
+                  parse_ISO8601_time('23:59:60.5Z', with_delta=True),
+                  parse_ISO8601_time('23:59:60.5', leapsecond=1, with_delta=True),
+                  parse_ISO8601_time('23:59:59.999999'),
+                  parse_ISO8601_datetime('2019-12-12T12:00').timetz()]
+        write_cache(self.path, values)
+        with ParsedCache(self.path) as c:
+            self.assertEqual([key(v) for v in c], [key(v) for v in values])
+
+    def test_concurrent_write(self):
+        # another writer finishing in the middle of this one
+        def values():
+            yield parse_ISO8601_datetime(inputs[0])
+            write_cache(self.path, [parse_ISO8601_datetime(s) for s in inputs])
+            yield parse_ISO8601_datetime(inputs[1])
+        write_cache(self.path, values())
+        with ParsedCache(self.path) as c:
+            self.assertEqual(len(c), 2)
+        self.assertEqual(os.listdir(self.dir.name), ['col.cache'])
+
+    def test_bad_file(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'\0' * HEADER_SIZE)
+        with self.assertRaises(ValueError):
+            ParsedCache(self.path)
+
+    def test_load(self):
+        with open(self.source, 'w') as f:
+            f.write('\n'.join(inputs[:3]) + '\n')
+        c = load_cache(self.path, self.source)
+        self.assertEqual([key(v) for v in c],
+                         [key(parse_ISO8601_datetime(s)) for s in inputs[:3]])
+        c.close()
+
+        # unchanged source: the cache is reused without parsing
+        def fail(s): raise AssertionError("parsed again")
+        c = load_cache(self.path, self.source, parse=fail)
+        self.assertEqual(len(c), 3)
+        c.close()
+
+        # changed source: the cache is rebuilt
+        with open(self.source, 'w') as f:
+            f.write('\n'.join(inputs) + '\n')
+        with load_cache(self.path, self.source) as c:
+            self.assertEqual(len(c), len(inputs))
+            self.assertTrue(c.is_fresh(self.source))
+
+    def test_write_error(self):
+        write_cache(self.path, [parse_ISO8601_datetime(inputs[0])])
+        def values():
+            yield parse_ISO8601_datetime(inputs[1])
+            raise ValueError("broken")
+        with self.assertRaisesRegex(ValueError, 'broken'):
+            write_cache(self.path, values())
+        self.assertFalse(os.path.exists(self.path + '.tmp'))
+        with ParsedCache(self.path) as c:
+            self.assertEqual(len(c), 1)
+
+    def test_load_blank(self):
+        with open(self.source, 'w') as f:
+            f.write(inputs[0] + '\n\n' + inputs[1] + '\n')
+        with self.assertRaisesRegex(ValueError, ':2: '):
+            load_cache(self.path, self.source)
+        self.assertEqual(os.listdir(self.dir.name), ['col.txt'])
+
+    def test_load_no_source(self):
+        with open(self.source, 'w') as f:
+            f.write(inputs[0] + '\n')
+        load_cache(self.path, self.source).close()
+        os.unlink(self.source)
+        closed = []
+        close = ParsedCache.close
+        ParsedCache.close = lambda c: (closed.append(c), close(c))
+        try:
+            with self.assertRaises(OSError):
+                load_cache(self.path, self.source)
+        finally:
+            ParsedCache.close = close
+        self.assertEqual(len(closed), 1)
+
+    def test_close_views(self):
+        write_cache(self.path, [parse_ISO8601_datetime(s) for s in inputs])
+        c = ParsedCache(self.path)
+        r = c.record(0)
+        c.close()
+        self.assertEqual(bytes(r[:8]), (1576183853000000).to_bytes(8, 'little'))
+        with self.assertRaises(ValueError):
+            c[0]
+        c.close()
+
+    @unittest.skipIf(iso8601_cache.numpy is None, "numpy is not available")
+    def test_array(self):
+        values = [parse_ISO8601_datetime(s) for s in inputs]
+        write_cache(self.path, values)
+        c = ParsedCache(self.path)
+        a = c.array()
+        self.assertEqual(len(a), len(values))
+        self.assertEqual(list(a['kind']), [c.fields(i)[4] for i in range(len(c))])
+        self.assertEqual(int(a['start'][0]), 1576183853000000)
+        del a
+        c.close()
+
+        # the array outlives the cache
+        with ParsedCache(self.path) as c:
+            a = c.array()
+        self.assertEqual(int(a['start'][0]), 1576183853000000)
+        with self.assertRaises(ValueError):
+            c.array()
+
+if __name__ == '__main__':
+    unittest.main()
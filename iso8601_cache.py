@@ -0,0 +1,322 @@
+# -*- python -*-
+# Binary cache of parsed ISO 8601:2019 datetime columns.
+#
+# https://github.com/yoiwa-personal/python-iso8601-full/
+#
+# Copyright 2019 Yutaka OIWA <yutaka@oiwa.jp>.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Binary cache of parsed ISO 8601:2019 datetime columns.
+
+The module stores values returned by the parsing functions of
+`iso8601` (and `rfc3339`) into a compact file of fixed-width records,
+so that a column parsed once can be reloaded without any parsing.
+
+The file consists of a 64-byte header followed by 32-byte records,
+all little-endian:
+
+   header: magic "ISO8601C", format version (uint16), record size
+           (uint16), reserved (uint32), number of records (int64),
+           size and mtime (in ns) of the source file (int64 each;
+           -1 if not given), zero padding.
+
+   record: start      int64   microseconds from 1970-01-01T00:00.
+                              For values with a time zone it is in
+                              UTC; otherwise it is the wall-clock time.
+                              For times of day, microseconds from
+                              midnight in wall-clock time, including
+                              the `delta` property (e.g. 86400000000
+                              for "24:00").
+           precision  int64   microseconds, -1 if unknown.
+           leap       int64   microseconds, -1 for None.
+           offset     int32   UTC offset in seconds (0 without zone).
+           kind       uint8   0: date, 1: datetime without time zone,
+                              2: datetime with a time zone,
+                              3: time without time zone,
+                              4: time with a time zone.
+           (3 bytes of padding)
+
+The file is opened with `mmap`: rows are decoded on access, without
+copying the file, and `ParsedCache.array()` exposes the whole file as
+a NumPy structured array (if NumPy is available).
+
+Provided functions are 'write_cache' and 'load_cache', and the class
+'ParsedCache'.
+"""
+
+__author__ = 'Yutaka OIWA <yutaka@oiwa.jp>'
+__all__ = ['write_cache', 'load_cache', 'ParsedCache']
+
+import os
+import mmap
+import struct
+import tempfile
+from datetime import datetime, date, time, timedelta
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from iso8601 import (dateWithPrecision, datetimeWithPrecision, timeWithPrecision,
+                     timezone, parse_ISO8601_datetime,
+                     _epoch, _epoch_utc, _epoch_date, _td_us, _zerodelta)
+
+MAGIC = b'ISO8601C'
+VERSION = 1
+
+_header = struct.Struct('<8sHHIqqq')
+_record = struct.Struct('<qqqiB3x')
+HEADER_SIZE = 64
+RECORD_SIZE = _record.size
+
+KIND_DATE, KIND_NAIVE, KIND_AWARE, KIND_TIME, KIND_AWARE_TIME = 0, 1, 2, 3, 4
+
+if numpy is not None:
+    record_dtype = numpy.dtype([('start', '<i8'), ('precision', '<i8'),
+                                ('leap', '<i8'), ('offset', '<i4'),
+                                ('kind', 'u1'), ('pad', 'V3')])
+else:
+    record_dtype = None
+
+_us = timedelta(microseconds=1)
+
+def _source_stamp(source):
+    if source is None:
+        return -1, -1
+    st = os.stat(source)
+    return st.st_size, st.st_mtime_ns
+
+def _pack(v):
+    p = getattr(v, 'precision', None)
+    p = -1 if p is None else _td_us(p)
+    if isinstance(v, datetime):
+        leap = getattr(v, 'leap', None)
+        leap = -1 if leap is None else _td_us(leap)
+        ofs = v.utcoffset()
+        if ofs is None:
+            return _record.pack(_td_us(v - _epoch), p, leap, 0, KIND_NAIVE)
+        return _record.pack(_td_us(v - _epoch_utc), p, leap,
+                            ofs.days * 86400 + ofs.seconds, KIND_AWARE)
+    elif isinstance(v, date):
+        return _record.pack(_td_us(v - _epoch_date), p, -1, 0, KIND_DATE)
+    elif isinstance(v, time):
+        leap = getattr(v, 'leap', None)
+        leap = -1 if leap is None else _td_us(leap)
+        us = (((v.hour * 60 + v.minute) * 60 + v.second) * 1000000 + v.microsecond
+              + _td_us(getattr(v, 'delta', _zerodelta)))
+        ofs = v.utcoffset()
+        if ofs is None:
+            return _record.pack(us, p, leap, 0, KIND_TIME)
+        return _record.pack(us, p, leap, ofs.days * 86400 + ofs.seconds, KIND_AWARE_TIME)
+    else:
+        raise TypeError("date, datetime or time value expected")
+
+def write_cache(path, values, source=None):
+    """Write parsed date/time values into a cache file.
+
+    `values` is an iterable of values returned by any of the parsing
+    functions (`date`, `datetime` or `time` objects, with or without
+    the `precision`, `leap` and `delta` properties); it is consumed
+    only once.
+
+    If `source` is given, the size and modification time of that file
+    are recorded, so that `load_cache` can detect changes.
+
+    The file is written under a unique temporary name and then
+    renamed, so that readers never see a partially written file, even
+    if several processes rebuild the same cache at once.  If `values`
+    raises an exception, the temporary file is removed and the
+    exception is propagated; an existing file at `path` is kept.
+
+    """
+    size, mtime = _source_stamp(source)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or '.',
+                               prefix=os.path.basename(path) + '.', suffix='.tmp')
+    n = 0
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(b'\0' * HEADER_SIZE)
+            for v in values:
+                f.write(_pack(v))
+                n += 1
+            f.seek(0)
+            f.write(_header.pack(MAGIC, VERSION, RECORD_SIZE, 0, n, size, mtime))
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    return n
+
+class ParsedCache(object):
+    """A read-only, memory-mapped view of a cache file.
+
+    Rows are accessed by index (`cache[i]`, negative indexes allowed)
+    and decoded into `dateWithPrecision`, `datetimeWithPrecision` or
+    `timeWithPrecision` objects (or plain `date`/`datetime`/`time` if
+    the precision was unknown).
+    Time zones are restored as fixed UTC offsets.
+
+    Views returned by `record` and `array` share the memory of the
+    mapped file.  They stay valid after the cache is closed: the
+    mapping is then released together with the last of them.
+
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._mmap) < HEADER_SIZE:
+            self.close()
+            raise ValueError("truncated cache file")
+        (magic, version, rsize, _, self.count,
+         self.source_size, self.source_mtime) = _header.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION or rsize != RECORD_SIZE:
+            self.close()
+            raise ValueError("not a cache file of a supported version")
+        if len(self._mmap) < HEADER_SIZE + self.count * RECORD_SIZE:
+            self.close()
+            raise ValueError("truncated cache file")
+
+    def close(self):
+        m, self._mmap = self._mmap, None
+        if m is not None:
+            try:
+                m.close()
+            except BufferError:
+                # views are still exported; the map is unmapped when
+                # the last of them is garbage-collected.
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.count
+
+    def _offset(self, i):
+        if self._mmap is None:
+            raise ValueError("cache is closed")
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError("cache index out of range")
+        return HEADER_SIZE + i * RECORD_SIZE
+
+    def record(self, i):
+        """Return the raw bytes of row `i` as a memoryview (no copy)."""
+        o = self._offset(i)
+        return memoryview(self._mmap)[o:o + RECORD_SIZE]
+
+    def fields(self, i):
+        """Return row `i` as a tuple (start, precision, leap, offset, kind)."""
+        return _record.unpack_from(self._mmap, self._offset(i))
+
+    def __getitem__(self, i):
+        start, prec, leap, ofs, kind = _record.unpack_from(self._mmap, self._offset(i))
+        prec = None if prec == -1 else prec * _us
+        leap = None if leap == -1 else leap * _us
+        if kind in (KIND_TIME, KIND_AWARE_TIME):
+            # a time beyond 23:59:59 keeps the excess seconds in delta
+            s, us = divmod(start, 1000000)
+            delta = max(s - 86399, 0)
+            s -= delta
+            tz = timezone(timedelta(seconds=ofs)) if kind == KIND_AWARE_TIME else None
+            t = time(s // 3600, s // 60 % 60, s % 60, us, tz)
+            if prec is None:
+                return t
+            return timeWithPrecision(t, timedelta(seconds=delta), leap, prec)
+        if kind == KIND_DATE:
+            d = _epoch_date + start * _us
+            return d if prec is None else dateWithPrecision(d, prec)
+        d = _epoch + start * _us
+        if kind == KIND_AWARE:
+            ofs = timedelta(seconds=ofs)
+            d = (d + ofs).replace(tzinfo=timezone(ofs))
+        if prec is None:
+            return d
+        return datetimeWithPrecision(d, leap, prec)
+
+    def __iter__(self):
+        for i in range(self.count):
+            yield self[i]
+
+    def array(self):
+        """Return all rows as a NumPy structured array, without copying.
+
+        The fields are named 'start', 'precision', 'leap', 'offset'
+        and 'kind', as described in the module documentation.  The
+        array is read-only; it keeps the file mapped while it is alive,
+        even after the cache is closed.
+
+        """
+        if numpy is None:
+            raise ImportError("numpy is required for array()")
+        if self._mmap is None:
+            raise ValueError("cache is closed")
+        return numpy.frombuffer(self._mmap, dtype=record_dtype,
+                                count=self.count, offset=HEADER_SIZE)
+
+    def is_fresh(self, source):
+        """Check whether the cache was built from the current `source` file."""
+        return (self.source_size, self.source_mtime) == _source_stamp(source)
+
+def load_cache(path, source, parse=parse_ISO8601_datetime):
+    """Open a cache of the date/time column in `source`, (re)building it if needed.
+
+    `source` is a text file with one date/time string per line.  If
+    the cache file at `path` is missing, unreadable, or was built
+    from a different version of `source`, every line is parsed with
+    the function `parse` and the cache is rewritten.
+
+    Row i of the cache is line i+1 of `source`, so blank lines are
+    not skipped: like any line which `parse` rejects, they raise a
+    ValueError naming the line number, and the old cache is kept.
+
+    Returns a `ParsedCache`.
+
+    """
+    try:
+        c = ParsedCache(path)
+    except (OSError, ValueError):
+        pass
+    else:
+        fresh = False
+        try:
+            fresh = c.is_fresh(source)
+        finally:
+            if not fresh:
+                c.close()
+        if fresh:
+            return c
+
+    def parse_lines(f):
+        for lineno, l in enumerate(f, 1):
+            try:
+                yield parse(l.strip())
+            except ValueError as e:
+                raise ValueError("%s:%d: invalid date/time (%s)" % (source, lineno, e))
+
+    # the stamp is taken before reading, so that a modification
+    # during parsing makes the new cache stale on the next load.
+    with open(source) as f:
+        write_cache(path, parse_lines(f), source=source)
+    return ParsedCache(path)
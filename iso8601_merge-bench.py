@@ -0,0 +1,51 @@
+# -*- python -*-
+# Merging logs timestamped with ISO 8601:2019 datetime strings.
+# BENCHMARK
+#
+# usage: python iso8601_merge-bench.py [number-of-logs [records-per-log]]
+
+from iso8601 import parse_ISO8601_datetime, parse_any
+from iso8601_merge import LogMerger
+
+from datetime import datetime, timedelta
+import random
+import sys
+import time
+import tracemalloc
+
+formats = [('%Y%m%dT%H%M%S', '+0900', 9),
+           ('%Y-%m-%dT%H:%M:%S', 'Z', 0),
+           ('%Y-%m-%dT%H:%M:%S.%f', '-05:00', -5),
+           ('%Y-%jT%H:%M:%S', '+01', 1)]
+
+def make_log(n, seed):
+    rnd = random.Random(seed)
+    fmt, tz, hours = formats[seed % len(formats)]
+    t = datetime(2019, 12, 12) + timedelta(hours=hours)
+    for i in range(n):
+        t += timedelta(microseconds=rnd.randrange(1, 2000000))
+        yield '%s%s host%d message %d\n' % (t.strftime(fmt), tz, seed, i)
+
+def run(nlogs, nrecords, parse):
+    n = 0
+    for r in LogMerger([make_log(nrecords, i) for i in range(nlogs)], parse=parse):
+        n += 1
+    return n
+
+def bench(nlogs, nrecords, parse):
+    start = time.perf_counter()
+    n = run(nlogs, nrecords, parse)
+    elapsed = time.perf_counter() - start
+    # memory is measured in a separate run: tracing slows everything down.
+    tracemalloc.start()
+    run(nlogs, nrecords, parse)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print("%-24s %4d logs: %8d records, %7.3f s, %9.0f records/s, peak %6.1f KiB"
+          % (parse.__name__, nlogs, n, elapsed, n / elapsed, peak / 1024.0))
+
+if __name__ == '__main__':
+    nlogs = int(sys.argv[1]) if len(sys.argv) > 1 else 128
+    nrecords = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    for parse in (parse_ISO8601_datetime, parse_any):
+        bench(nlogs, nrecords, parse)
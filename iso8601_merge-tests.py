@@ -0,0 +1,75 @@
+# -*- python -*-
+# Merging logs timestamped with ISO 8601:2019 datetime strings.
+# TESTS
+
+from iso8601 import parse_any
+from iso8601_merge import merge_logs, LogMerger
+
+from datetime import timedelta
+import iso8601
+import os
+import tempfile
+import unittest
+
+host_a = ['20191212T123430+0900 a1\n',
+          '20191212T123500+0900 a2\n',
+          '2019-12-12T13:00+09:00 a3\n']
+host_b = ['2019-12-12T03:34:30Z b1\n',
+          '2019-12-12T03:34:30.5Z b2\n',
+          '2019-12-12T04:30Z b3\n']
+host_c = ['2019-12-11T22:34:40-05:00 c1\n']
+
+tags = lambda it: [r.split()[1] for name, r, v in it]
+
+class Test_ISO8601_Merge(unittest.TestCase):
+
+    def test_merge(self):
+        r = merge_logs({'a': host_a, 'b': host_b, 'c': host_c})
+        self.assertEqual(tags(r), ['a1', 'b1', 'b2', 'c1', 'a2', 'a3', 'b3'])
+
+    def test_precision(self):
+        # same start: finer precision first, then by order of logs
+        r = merge_logs([['2019-12-12T03 x1\n'], ['2019-12-12T03:00Z x2\n'],
+                        ['2019-12-12T03Z x3\n']])
+        self.assertEqual(tags(r), ['x2', 'x1', 'x3'])
+
+    def test_names(self):
+        r = [(n, v) for n, rec, v in merge_logs([host_b, host_a])]
+        self.assertEqual([n for n, v in r], [0, 1, 0, 1, 1, 0])
+        self.assertEqual(r[0][1].precision, timedelta(seconds=1))
+
+    def test_default_tz(self):
+        r = merge_logs({'a': ['2019-12-12T12:00 a\n'], 'b': ['2019-12-12T04:00Z b\n']},
+                       default_tz=iso8601.timezone(timedelta(hours=9)), parse=parse_any)
+        self.assertEqual(tags(r), ['a', 'b'])
+
+    def test_disorder(self):
+        found = []
+        m = LogMerger({'a': host_a, 'b': [host_b[1], host_b[0], host_b[2]]},
+                      on_disorder=lambda *a: found.append(a))
+        self.assertEqual(tags(m), ['a1', 'b2', 'b1', 'a2', 'a3', 'b3'])
+        self.assertEqual(m.disorders, {'a': 0, 'b': 1})
+        self.assertEqual(found, [('b', 2, host_b[0])])
+        with self.assertRaises(RuntimeError):
+            list(m)
+
+    def test_invalid(self):
+        with self.assertRaisesRegex(ValueError, '^b:2: '):
+            list(merge_logs({'a': host_a, 'b': [host_b[0], 'garbage\n']}))
+
+    def test_blank(self):
+        r = merge_logs({'a': host_a + ['\n'], 'b': ['\n', host_b[0], '  \n', host_b[2]]})
+        self.assertEqual(tags(r), ['a1', 'b1', 'a2', 'a3', 'b3'])
+
+    def test_files(self):
+        with tempfile.TemporaryDirectory() as d:
+            paths = []
+            for i, lines in enumerate((host_a, host_b, host_c)):
+                paths.append(os.path.join(d, '%d.log' % i))
+                with open(paths[-1], 'w') as f:
+                    f.writelines(lines)
+            self.assertEqual(tags(merge_logs(paths)),
+                             ['a1', 'b1', 'b2', 'c1', 'a2', 'a3', 'b3'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,177 @@
+# -*- python -*-
+# Merging logs timestamped with ISO 8601:2019 datetime strings.
+#
+# https://github.com/yoiwa-personal/python-iso8601-full/
+#
+# Copyright 2019 Yutaka OIWA <yutaka@oiwa.jp>.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Merging logs timestamped with ISO 8601:2019 datetime strings.
+
+The module merges several logs, each sorted by time, into a single
+stream ordered by time.  Each log may use its own variant of ISO 8601
+notation and time zone offset, e.g. "20191212T123430+0900" in one log
+and "2019-12-12T03:34:30Z" in another.
+
+Records are read and parsed lazily: only one record per log is kept
+in memory at a time.  Records are ordered by their starting instant
+in UTC, then by precision (finer first), then by the order of logs.
+
+Provided are the class 'LogMerger' and the function 'merge_logs'.
+"""
+
+__author__ = 'Yutaka OIWA <yutaka@oiwa.jp>'
+__all__ = ['merge_logs', 'LogMerger', 'first_field']
+
+from heapq import heapify, heappop, heapreplace
+from datetime import datetime, time
+
+from iso8601 import parse_ISO8601_datetime, _timezone_utc, _epoch, _epoch_utc, _td_us
+
+_midnight = time(0)
+
+def first_field(record):
+    """Return the first whitespace-separated field of a log line.
+
+    An empty string is returned for a blank line.
+
+    """
+    f = record.split(None, 1)
+    return f[0] if f else ''
+
+def _sort_key(v, default_tz):
+    p = getattr(v, 'precision', None)
+    if not isinstance(v, datetime):
+        v = datetime.combine(v, _midnight)
+    ofs = v.utcoffset()
+    if ofs is None:
+        t = v - _epoch - default_tz.utcoffset(v)
+    else:
+        t = v - _epoch_utc
+    return _td_us(t), 0 if p is None else _td_us(p)
+
+class LogMerger(object):
+    """Merge logs sorted by time into a single time-ordered stream.
+
+    `sources` is either a sequence or a mapping from names to logs.
+    Each log is an iterable of records (e.g. an open file), or a file
+    name as a string, which is opened when the merge starts and closed
+    at its end.  Logs in a sequence are named by their indexes.
+
+    Iterating over the merger yields tuples (name, record, value),
+    where `value` is the parsed timestamp of the record.  A merger can
+    be iterated only once.
+
+    Optional arguments:
+
+      key: a function extracting the timestamp string from a record.
+           Defaults to `first_field`.
+
+      parse: a function parsing the timestamp string.  Defaults to
+             `parse_ISO8601_datetime`; `parse_any` is also suitable.
+
+      default_tz: a `tzinfo` applied to timestamps without time zone
+                  (including date-only ones).  Defaults to UTC.
+
+      on_disorder: a function called as on_disorder(name, lineno,
+                   record) for a record earlier than the previous one
+                   of the same log.  Such records are counted in the
+                   property `disorders` (a dict from log names to
+                   counts) and still yielded, as early as possible.
+
+    Records with an empty key (with `first_field`, blank lines such
+    as an extra newline at the end of a file) are skipped.  Any other
+    record whose timestamp cannot be parsed raises a ValueError
+    naming the log and the line number.
+
+    """
+
+    def __init__(self, sources, key=first_field, parse=parse_ISO8601_datetime,
+                 default_tz=_timezone_utc, on_disorder=None):
+        if hasattr(sources, 'items'):
+            self.names, self.sources = zip(*sources.items()) if sources else ((), ())
+        else:
+            self.sources = tuple(sources)
+            self.names = tuple(range(len(self.sources)))
+        self.key = key
+        self.parse = parse
+        self.default_tz = default_tz
+        self.on_disorder = on_disorder
+        self.disorders = dict((n, 0) for n in self.names)
+        self._started = False
+
+    def __iter__(self):
+        if self._started:
+            raise RuntimeError("LogMerger can be iterated only once")
+        self._started = True
+        opened = []
+        try:
+            iters = []
+            for s in self.sources:
+                if isinstance(s, str):
+                    s = open(s)
+                    opened.append(s)
+                iters.append(iter(s))
+            for r in self._merge(iters):
+                yield r
+        finally:
+            for f in opened:
+                f.close()
+
+    def _merge(self, iters):
+        names, key, parse, tz = self.names, self.key, self.parse, self.default_tz
+        last = [None] * len(iters)
+        lineno = [0] * len(iters)
+
+        def advance(i):
+            for record in iters[i]:
+                lineno[i] += 1
+                try:
+                    k = key(record)
+                    if not k:
+                        continue
+                    v = parse(k)
+                except (ValueError, IndexError) as e:
+                    raise ValueError("%s:%d: invalid timestamp (%s)"
+                                     % (names[i], lineno[i], e))
+                t, p = _sort_key(v, tz)
+                if last[i] is not None and t < last[i]:
+                    self.disorders[names[i]] += 1
+                    if self.on_disorder:
+                        self.on_disorder(names[i], lineno[i], record)
+                else:
+                    last[i] = t
+                # the source index is unique in the heap, so that
+                # records and values are never compared.
+                return (t, p, i, record, v)
+            return None
+
+        heap = [e for e in (advance(i) for i in range(len(iters))) if e is not None]
+        heapify(heap)
+        while heap:
+            t, p, i, record, v = heap[0]
+            yield (names[i], record, v)
+            e = advance(i)
+            if e is None:
+                heappop(heap)
+            else:
+                heapreplace(heap, e)
+
+def merge_logs(sources, **kwargs):
+    """Merge logs sorted by time; a shorthand of `iter(LogMerger(...))`.
+
+    See `LogMerger` for the arguments and the yielded values.
+
+    """
+    return iter(LogMerger(sources, **kwargs))
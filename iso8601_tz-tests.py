@@ -0,0 +1,98 @@
+# -*- python -*-
+# Converting parsed ISO 8601:2019 datetimes to IANA time zones.
+# TESTS
+
+from iso8601 import parse_ISO8601_datetime, parse_any
+from iso8601_tz import (convert_ISO8601_datetimes, convert_epochs, zone_table,
+                        AmbiguousTimeError, NonExistentTimeError)
+
+from datetime import datetime, timedelta
+import zoneinfo
+
+import iso8601_tz
+
+import unittest
+
+NY = 'America/New_York'
+
+class Test_ISO8601_TZ(unittest.TestCase):
+
+    def t_c(self, s, ex, key=NY, **kw):
+        p = parse_ISO8601_datetime(s)
+        r = convert_ISO8601_datetimes([p], key, **kw)[0]
+        self.assertEqual((str(r), r.fold, r.precision, r.leap),
+                         (ex[0], ex[1], p.precision, p.leap))
+
+    def test_c01(s): s.t_c('2019-12-12T20:50:53Z',      ('2019-12-12 15:50:53-05:00', 0))
+    def test_c02(s): s.t_c('2019-07-01T09:00+09:00',    ('2019-06-30 20:00:00-04:00', 0))
+    def test_c03(s): s.t_c('2019-11-03T05:30Z',         ('2019-11-03 01:30:00-04:00', 0))
+    def test_c04(s): s.t_c('2019-11-03T06:30Z',         ('2019-11-03 01:30:00-05:00', 1))
+    def test_c05(s): s.t_c('2016-12-31T23:59:60.5Z',    ('2016-12-31 19:00:00-05:00', 0))
+    def test_c06(s): s.t_c('20191212T1230',             ('2019-12-12 12:30:00-05:00', 0))
+
+    # naive input: wall-clock time in the target zone
+    def test_c07(s): s.t_c('2019-11-03T01:30', ('2019-11-03 01:30:00-04:00', 0), ambiguous="earlier")
+    def test_c08(s): s.t_c('2019-11-03T01:30', ('2019-11-03 01:30:00-05:00', 1), ambiguous="later")
+    def test_c09(s): s.t_c('2019-03-10T02:30', ('2019-03-10 03:00:00-04:00', 0), nonexistent="shift_forward")
+    def test_c10(s): s.t_c('2019-03-10T02:30', ('2019-03-10 01:59:59.999999-05:00', 0), nonexistent="shift_backward")
+
+    def test_raise(self):
+        p = parse_ISO8601_datetime('2019-11-03T01:30')
+        with self.assertRaises(AmbiguousTimeError):
+            convert_ISO8601_datetimes([p], NY)
+        p = parse_ISO8601_datetime('2019-03-10T02:30')
+        with self.assertRaises(NonExistentTimeError):
+            convert_ISO8601_datetimes([p], NY)
+
+    def test_date(self):
+        p = parse_ISO8601_datetime('2019-W50')
+        self.assertIs(convert_ISO8601_datetimes([p], NY)[0], p)
+
+    def test_plain(self):
+        p = datetime(2019, 12, 12, 12, 0)
+        r = convert_ISO8601_datetimes([p, parse_any('2019-12-12T12:00:00Z')], 'Asia/Tokyo')
+        self.assertEqual([str(x) for x in r], ['2019-12-12 12:00:00+09:00',
+                                               '2019-12-12 21:00:00+09:00'])
+        self.assertFalse(hasattr(r[0], 'precision'))
+
+    def test_epochs(self):
+        tz = zoneinfo.ZoneInfo(NY)
+        epochs = [-2000000000, 0, 1572759000, 1572762600, 4102444800, 9000000000]
+        self.assertEqual([(d, d.fold) for d in convert_epochs(epochs, NY)],
+                         [(d, d.fold) for d in
+                          (datetime.fromtimestamp(t, tz) for t in epochs)])
+
+    def test_table(self):
+        # the table must agree with zoneinfo, including times after the
+        # end of the TZif data.
+        tz = zoneinfo.ZoneInfo('Europe/London')
+        table = zone_table('Europe/London')
+        epochs = list(range(-2500000000, 5000000000, 3999991))
+        offsets = table.utcoffsets(epochs)
+        for t, o in zip(epochs, offsets):
+            with self.subTest(t=t):
+                ofs = datetime.fromtimestamp(t, tz).utcoffset()
+                self.assertEqual(o, ofs // timedelta(seconds=1))
+
+    @unittest.skipIf(iso8601_tz.numpy is None, "numpy is not available")
+    def test_array(self):
+        import numpy
+        tz = zoneinfo.ZoneInfo(NY)
+        epochs = numpy.arange(-2500000000, 5000000000, 3999991)
+        ex = [datetime.fromtimestamp(t, tz) for t in epochs.tolist()]
+        offsets = zone_table(NY).utcoffsets(epochs)
+        self.assertIsInstance(offsets, numpy.ndarray)
+        self.assertEqual(offsets.tolist(), [d.utcoffset() // timedelta(seconds=1) for d in ex])
+        self.assertEqual([(d, d.fold) for d in convert_epochs(epochs, NY)],
+                         [(d, d.fold) for d in ex])
+
+    def test_far_future(self):
+        self.assertEqual(zone_table('Asia/Tokyo').utcoffset(253402300799 - 86400 - 1), 32400)
+        self.t_c('9999-12-31T12:00', ('9999-12-31 12:00:00+00:00', 0), key='Europe/London')
+        # the table is not extended up to such sentinels
+        self.assertLess(len(zone_table('Europe/London').transitions), 1000)
+        self.t_c('2150-03-29T02:30', ('2150-03-29 03:00:00+02:00', 0), key='Europe/Paris',
+                 nonexistent="shift_forward")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,412 @@
+# -*- python -*-
+# Converting parsed ISO 8601:2019 datetimes to IANA time zones.
+#
+# https://github.com/yoiwa-personal/python-iso8601-full/
+#
+# Copyright 2019 Yutaka OIWA <yutaka@oiwa.jp>.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Converting parsed ISO 8601:2019 datetimes to IANA time zones.
+
+The module converts many values returned by `iso8601.parse_ISO8601_datetime`
+(or by `iso8601.parse_any`), or raw POSIX epoch seconds, into a single
+IANA time zone (e.g. "Asia/Tokyo") at once.
+
+The transition table of each zone is read once from the system's
+TZif database and cached.  UTC offsets of epoch arrays are looked up
+by a binary search over that table (vectorised with
+`numpy.searchsorted` if a NumPy array is given).  Datetimes without a time zone are taken as
+wall-clock times in the target zone; ambiguous and non-existent
+wall-clock times (around daylight saving transitions) are handled as
+requested by the caller instead of being silently folded.
+
+Provided functions are 'convert_ISO8601_datetimes', 'convert_epochs'
+and 'zone_table'.
+
+Requires the standard `zoneinfo` module (Python 3.9 or later).
+"""
+
+__author__ = 'Yutaka OIWA <yutaka@oiwa.jp>'
+__all__ = ['convert_ISO8601_datetimes', 'convert_epochs', 'zone_table',
+           'ZoneTable', 'AmbiguousTimeError', 'NonExistentTimeError']
+
+import os
+import struct
+from bisect import bisect_right
+from datetime import datetime, timedelta
+
+try:
+    import zoneinfo
+except ImportError:
+    zoneinfo = None
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from iso8601 import datetimeWithPrecision, _epoch, _epoch_utc, _td_us
+
+# range of POSIX seconds representable by `datetime`, leaving a day of
+# margin for the local-time offset.
+_min_epoch = -62135596800 + 86400
+_max_epoch = 253402300799 - 86400
+
+# Transitions after the end of a TZif table (given by the POSIX TZ
+# rule in its footer) are found by probing in this step.  It is short
+# enough not to skip over any daylight saving period.
+_probe_step = 14 * 86400
+
+# Probing stops at 2100-01-01T00:00Z; later instants (e.g. sentinels
+# like 9999-12-31) are converted by zoneinfo one by one, as are those
+# before the floor of a zone without TZif data.
+_ceiling = 4102444800
+
+class AmbiguousTimeError(ValueError):
+    pass
+
+class NonExistentTimeError(ValueError):
+    pass
+
+def _read_tzif_transitions(key):
+    data = None
+    for d in zoneinfo.TZPATH:
+        p = os.path.join(d, key)
+        if os.path.isfile(p):
+            with open(p, 'rb') as f:
+                data = f.read()
+            break
+    else:
+        try:
+            import importlib.resources
+            *pkg, name = key.split('/')
+            pkg = '.'.join(['tzdata', 'zoneinfo'] + pkg)
+            data = importlib.resources.files(pkg).joinpath(name).read_bytes()
+        except Exception:
+            return None
+    if data[:4] != b'TZif':
+        return None
+    counts = lambda o: struct.unpack('>6l', data[o + 20:o + 44])
+    isutcnt, isstdcnt, leapcnt, timecnt, typecnt, charcnt = counts(0)
+    if data[4:5] == b'\0':
+        return struct.unpack('>%dl' % timecnt, data[44:44 + 4 * timecnt])
+    # version 2+: skip the 32-bit block and use the 64-bit one.
+    o = (44 + timecnt * 5 + typecnt * 6 + charcnt + leapcnt * 8
+         + isstdcnt + isutcnt)
+    isutcnt, isstdcnt, leapcnt, timecnt, typecnt, charcnt = counts(o)
+    return struct.unpack('>%dq' % timecnt, data[o + 44:o + 44 + 8 * timecnt])
+
+def _offset_at(tz, t):
+    dt = tz.fromutc((_epoch + timedelta(seconds=t)).replace(tzinfo=tz))
+    o = dt.utcoffset()
+    return o.days * 86400 + o.seconds
+
+class ZoneTable(object):
+    """Transition table of a single IANA time zone.
+
+    Properties:
+
+      tzinfo: the `zoneinfo.ZoneInfo` object of the zone.
+
+      transitions: a sorted list of POSIX seconds where the UTC offset
+                   changes.
+
+      offsets: a list of UTC offsets (in seconds), one longer than
+               `transitions`; offsets[i] is effective from
+               transitions[i-1] until transitions[i].
+
+    The table is extended on demand for times after the last
+    transition recorded in the TZif file, up to the year 2100.
+
+    """
+
+    def __init__(self, key):
+        if zoneinfo is None:
+            raise ImportError("zoneinfo module is required")
+        self.key = key
+        self.tzinfo = tz = zoneinfo.ZoneInfo(key)
+        trans = _read_tzif_transitions(key)
+        if trans is None:
+            # no TZif data available: probe from the epoch and rely on
+            # zoneinfo for anything earlier.
+            self._floor = 0
+            trans = []
+        else:
+            self._floor = None
+            trans = [t for t in trans if _min_epoch < t < _max_epoch]
+        self.transitions = trans
+        self.offsets = ([_offset_at(tz, trans[0] - 1) if trans
+                         else _offset_at(tz, 0)] +
+                        [_offset_at(tz, t) for t in trans])
+        self._horizon = trans[-1] if trans else 0
+        self._ceiling = max(_ceiling, self._horizon + 1)
+        self._update()
+
+    def _update(self):
+        # derived tables, indexed like `offsets`: the offsets as
+        # timedeltas, and the end of the repeated wall-clock times
+        # (which need fold=1) after a backward transition.
+        trans, offs = self.transitions, self.offsets
+        self._deltas = [timedelta(seconds=o) for o in offs]
+        self._fold_until = [None] + [t + (p - o) if p > o else None
+                                     for t, p, o in zip(trans, offs, offs[1:])]
+        self._numpy = None
+
+    def _extend(self, until):
+        until = min(until, self._ceiling)
+        if until <= self._horizon:
+            return
+        tz = self.tzinfo
+        t = self._horizon
+        off = self.offsets[-1]
+        limit = min(until + _probe_step, _max_epoch)
+        while t < limit:
+            t2 = min(t + _probe_step, _max_epoch)
+            off2 = _offset_at(tz, t2)
+            if off2 != off:
+                lo, hi = t, t2
+                while hi - lo > 1:
+                    mid = (lo + hi) // 2
+                    if _offset_at(tz, mid) == off:
+                        lo = mid
+                    else:
+                        hi = mid
+                self.transitions.append(hi)
+                self.offsets.append(off2)
+                off = off2
+            t = t2
+        self._horizon = t
+        self._update()
+
+    def _outside(self, t):
+        # whether POSIX second `t` is not covered by the table
+        return t >= self._ceiling or (self._floor is not None and t < self._floor)
+
+    def _lookup(self, epochs):
+        # indexes into `offsets`, meaningless for seconds _outside the
+        # table: a NumPy array for a NumPy array input, a list otherwise.
+        if numpy is not None and isinstance(epochs, numpy.ndarray):
+            if len(epochs) == 0:
+                return numpy.zeros(0, dtype=numpy.int64)
+            self._extend(int(epochs.max()))
+            self._numpy_offsets()
+            return numpy.searchsorted(self._numpy[0], epochs, side='right')
+        if not epochs:
+            return []
+        self._extend(max(epochs))
+        trans = self.transitions
+        return [bisect_right(trans, t) for t in epochs]
+
+    def _numpy_offsets(self):
+        if self._numpy is None:
+            self._numpy = (numpy.array(self.transitions, dtype=numpy.int64),
+                           numpy.array(self.offsets, dtype=numpy.int64))
+        return self._numpy[1]
+
+    def utcoffset(self, t):
+        """Return the UTC offset (in seconds) at POSIX second `t`."""
+        if self._outside(t):
+            return _offset_at(self.tzinfo, t)
+        if t > self._horizon:
+            self._extend(t)
+        return self.offsets[bisect_right(self.transitions, t)]
+
+    def utcoffsets(self, epochs):
+        """Return UTC offsets (in seconds) for a sequence of POSIX seconds.
+
+        If `epochs` is a NumPy array, the lookup is vectorised and a
+        NumPy integer array is returned.  Otherwise a list is returned.
+
+        """
+        if numpy is not None and isinstance(epochs, numpy.ndarray):
+            idx = self._lookup(epochs)
+            r = self._numpy_offsets()[idx]
+            outside = epochs >= self._ceiling
+            if self._floor is not None:
+                outside |= epochs < self._floor
+            if outside.any():
+                r[outside] = [self.utcoffset(int(t)) for t in epochs[outside]]
+            return r
+        epochs = list(epochs)
+        offs = self.offsets
+        return [self.utcoffset(t) if self._outside(t) else offs[i]
+                for t, i in zip(epochs, self._lookup(epochs))]
+
+    def localize(self, wall, ambiguous="raise", nonexistent="raise"):
+        """Find the instant of a wall-clock time in this zone.
+
+        `wall` is a `timedelta` from 1970-01-01T00:00 local time.
+        Returns a `timedelta` from the epoch in UTC.  See
+        `convert_ISO8601_datetimes` for `ambiguous` and `nonexistent`.
+
+        """
+        w = _td_us(wall) // 1000000
+        clamp = lambda t: max(_min_epoch, min(t, _max_epoch))
+        o1 = self.utcoffset(clamp(w - 86400))
+        o2 = self.utcoffset(clamp(w + 86400))
+        cands = sorted(set(o for o in (o1, o2)
+                           if self.utcoffset(clamp(w - o)) == o), reverse=True)
+        if len(cands) == 1:
+            return wall - timedelta(seconds=cands[0])
+        elif len(cands) == 2:
+            if ambiguous == "earlier":
+                return wall - timedelta(seconds=cands[0])
+            elif ambiguous == "later":
+                return wall - timedelta(seconds=cands[1])
+            elif ambiguous == "raise":
+                raise AmbiguousTimeError("ambiguous local time in %s" % self.key)
+            else:
+                raise ValueError("invalid ambiguous= argument")
+        else:
+            # in a gap: the transition is between w - o2 and w - o1.
+            lo, hi = w - o2, w - o1
+            while hi - lo > 1:
+                mid = (lo + hi) // 2
+                if self.utcoffset(mid) == o1:
+                    lo = mid
+                else:
+                    hi = mid
+            t = hi
+            if nonexistent == "shift_forward":
+                return timedelta(seconds=t)
+            elif nonexistent == "shift_backward":
+                return timedelta(seconds=t) - timedelta.resolution
+            elif nonexistent == "raise":
+                raise NonExistentTimeError("non-existent local time in %s" % self.key)
+            else:
+                raise ValueError("invalid nonexistent= argument")
+
+    def to_local(self, instants, sources=None):
+        """Convert `timedelta`s from the epoch to aware `datetime`s.
+
+        `instants` is a list of `timedelta` objects.  If `sources` is
+        given, it is a list of the same length; where its element is a
+        `datetimeWithPrecision`, the result is also one, with the
+        `leap` and `precision` copied.
+
+        """
+        tz = self.tzinfo
+        secs = [t.days * 86400 + t.seconds for t in instants]
+        if numpy is not None and len(secs) > 1:
+            idx = self._lookup(numpy.array(secs, dtype=numpy.int64)).tolist()
+        else:
+            idx = self._lookup(secs)
+        deltas, fold_until = self._deltas, self._fold_until
+        # aware + timedelta keeps the tzinfo without consulting it.
+        epoch = _epoch.replace(tzinfo=tz)
+        local = [epoch + (t + deltas[i]) for t, i in zip(instants, idx)]
+        for n, s, i in zip(range(len(secs)), secs, idx):
+            if self._outside(s):
+                local[n] = tz.fromutc((_epoch + instants[n]).replace(tzinfo=tz))
+                continue
+            f = fold_until[i]
+            if f is not None and s < f:
+                local[n] = local[n].replace(fold=1)
+        if sources is None:
+            return local
+        new = datetime.__new__
+        r = []
+        for d, v in zip(local, sources):
+            if isinstance(v, datetimeWithPrecision):
+                # built bypassing the constructor: set the properties here.
+                d = new(datetimeWithPrecision, d.year, d.month, d.day, d.hour,
+                        d.minute, d.second, d.microsecond, tz, fold=d.fold)
+                d.leap = v.leap
+                d.precision = v.precision
+            r.append(d)
+        return r
+
+_zone_tables = {}
+
+def zone_table(key):
+    """Return a cached `ZoneTable` for the IANA time zone `key`."""
+    t = _zone_tables.get(key)
+    if t is None:
+        t = _zone_tables[key] = ZoneTable(key)
+    return t
+
+def convert_epochs(epochs, key):
+    """Convert POSIX seconds to aware `datetime`s in a time zone.
+
+    `epochs` is a sequence (or a NumPy array) of int or float seconds.
+    Returns a list of `datetime` objects with the `zoneinfo.ZoneInfo`
+    of `key`, created by `datetime.fromtimestamp`, which is faster
+    than any batch processing in Python.
+
+    For a NumPy array, `zone_table(key).utcoffsets(epochs)` gives the
+    UTC offsets in a vectorised way, without creating any objects;
+    adding them to `epochs` gives local wall-clock seconds.
+
+    """
+    if numpy is not None and isinstance(epochs, numpy.ndarray):
+        epochs = epochs.tolist()
+    tz = zone_table(key).tzinfo
+    fromtimestamp = datetime.fromtimestamp
+    return [fromtimestamp(t, tz) for t in epochs]
+
+def convert_ISO8601_datetimes(values, key, ambiguous="raise", nonexistent="raise"):
+    """Convert parsed date/time values to a time zone in bulk.
+
+    `values` is a sequence of values returned by
+    `parse_ISO8601_datetime`, `parse_any` or `parse_RFC3339_datetime`.
+    `key` is an IANA time zone name.
+
+    Returns a list of converted values.  `datetime` values become
+    aware `datetime`s in the zone, keeping their `precision` and
+    `leap` properties if any.  Pure `date` values (without a time
+    part) do not denote an instant and are returned unchanged.
+
+    Datetimes without time zone are taken as wall-clock times in the
+    target zone.  Optional arguments specify how impossible
+    wall-clock times are handled:
+
+      ambiguous: for times repeated when the clock is set back,
+          "earlier": the first occurrence.
+          "later":   the second occurrence.
+          "raise":   raise an AmbiguousTimeError (default).
+
+      nonexistent: for times skipped when the clock is set forward,
+          "shift_forward":  the first instant after the gap.
+          "shift_backward": the last instant (one microsecond) before the gap.
+          "raise":          raise a NonExistentTimeError (default).
+
+    """
+    table = zone_table(key)
+    tz = table.tzinfo
+    values = list(values)
+    if all(type(v) is datetime and v.tzinfo is not None for v in values):
+        # plain aware datetimes: astimezone (in C) is the fastest.
+        return [v.astimezone(tz) for v in values]
+    # Values with precision are converted in a batch: UTC instants
+    # first, then a single lookup in the transition table.  This
+    # avoids copying the properties at each step of astimezone.
+    # Subtraction is done by the base class for the same reason.
+    sub = datetime.__sub__
+    r = list(values)
+    rows, instants = [], []
+    for i, v in enumerate(values):
+        if not isinstance(v, datetime):
+            continue
+        if v.tzinfo is None:
+            t = table.localize(sub(v, _epoch), ambiguous, nonexistent)
+        else:
+            t = sub(v, _epoch_utc)
+        if isinstance(v, datetimeWithPrecision):
+            rows.append(i)
+            instants.append(t)
+        else:
+            r[i] = (_epoch_utc + t).astimezone(tz)
+    for i, d in zip(rows, table.to_local(instants, [values[i] for i in rows])):
+        r[i] = d
+    return r
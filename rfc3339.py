@@ -57,6 +57,8 @@ except ImportError:
 
 from datetime import date, datetime
 
+_RFC3339_datetime_re = re.compile(RFC3339_datetime_regexp)
+
 class LeapSecondValueError(ValueError):
     pass
 
@@ -75,7 +77,7 @@ def parse_RFC3339_datetime(s, leapsecond=0):
       - "raise": raises a ValueError.
     """
 
-    match = re.match(RFC3339_datetime_regexp, s)
+    match = _RFC3339_datetime_re.match(s)
     if not match:
         raise ValueError("invalid RFC3339 datestring")
     (year, month, day, hour, minute, second, fraction, tz, tzsign, tzhour, tzminute) = match.groups()